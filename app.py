@@ -1,16 +1,18 @@
+import bisect
+import io
 import re
 import time
 import sqlite3
-from dataclasses import dataclass, asdict
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from urllib.parse import urlparse
 from typing import Optional, Dict, Any, Tuple, List
 
 import streamlit as st
-import requests
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.pagesizes import LETTER
-from reportlab.lib import colors
+
+from core_math import CORE_KEYS, METRIC_KEYS, decode_flags, get_weights, underwrite_core
 
 # =====================================
 # AIRE™ — Production-ish Streamlit App
@@ -23,6 +25,7 @@ DB_PATH = "aire_app.db"
 FREE_CREDITS = 2        # free analyses per email
 PRO_CREDITS = 5000      # effectively "unlimited" for MVP
 CREDIT_COST_PER_ANALYSIS = 1
+HISTORY_PAGE_SIZE = 20   # rows shown (and fetched) on the History page
 
 # UI Theme vars (kept for CSS only; Streamlit theme set in config.toml)
 SOFT_BG = "#F6F8FB"
@@ -35,7 +38,9 @@ DANGER = "#B91C1C"
 
 st.set_page_config(page_title=f"{APP_NAME} | Property Grader", page_icon="🏠", layout="wide")
 
-CSS = f"""
+@st.cache_data(show_spinner=False)
+def _page_css() -> str:
+    return f"""
 <style>
   .main {{ background: {SOFT_BG}; }}
   .block-container {{ padding-top: 1.25rem; padding-bottom: 2.5rem; max-width: 1200px; }}
@@ -103,7 +108,17 @@ CSS = f"""
   }}
 </style>
 """
-st.markdown(CSS, unsafe_allow_html=True)
+
+st.markdown(_page_css(), unsafe_allow_html=True)
+
+# Reused markup fragments; built once so page code doesn't re-create the
+# same literals on every rerun.
+CARD_OPEN = '<div class="aire-card">'
+CARD_CLOSE = "</div>"
+DISCLAIMER_HTML = (
+    f'<div class="aire-disclaimer">Disclaimer: {APP_NAME} is informational '
+    "and not financial advice. Always verify inputs and assumptions.</div>"
+)
 
 # ----------------------------
 # Data model
@@ -126,8 +141,29 @@ class PropertyData:
 # ----------------------------
 # Database
 # ----------------------------
-def _db():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+# The cached connection is shared across sessions (check_same_thread=False),
+# so writes are serialized through this lock. It lives in the resource cache
+# because a module-level Lock would be reborn with the script on every rerun
+# and never actually be shared between session threads.
+@st.cache_resource(show_spinner=False)
+def _db_lock() -> threading.Lock:
+    return threading.Lock()
+
+# SQL lives in module constants so every call passes byte-identical text and
+# sqlite3's prepared-statement cache stays hot.
+_SQL_UPSERT_USER = """INSERT INTO users(email, credits, paid, created_at, updated_at) VALUES(?,?,?,?,?)
+                      ON CONFLICT(email) DO UPDATE SET email=email
+                      RETURNING email, credits, paid"""
+_SQL_SET_PAID = "UPDATE users SET paid=?, credits=?, updated_at=? WHERE email=?"
+_SQL_SPEND_CREDIT = """UPDATE users
+                       SET credits = CASE WHEN paid=1 THEN credits ELSE credits - ? END,
+                           updated_at = ?
+                       WHERE email=? AND (paid=1 OR credits >= ?)"""
+_SQL_INSERT_ANALYSIS = """INSERT INTO analyses(email, created_at, address, listing_url, grade, verdict, score, dscr, noi, cap_rate, coc_return, json_payload)
+                          VALUES(?,?,?,?,?,?,?,?,?,?,?,?)"""
+_SQL_FETCH_ANALYSES = "SELECT created_at, address, listing_url, grade, verdict, score, dscr, noi, cap_rate, coc_return FROM analyses WHERE email=? ORDER BY created_at DESC LIMIT ?"
+
+def _init_schema(conn: sqlite3.Connection) -> None:
     conn.execute("""
         CREATE TABLE IF NOT EXISTS users (
             email TEXT PRIMARY KEY,
@@ -154,88 +190,131 @@ def _db():
             json_payload TEXT
         )
     """)
+    # fetch_analyses filters on email and sorts by created_at DESC; without
+    # this index every History visit is a full scan + sort.
+    conn.execute("""
+        CREATE INDEX IF NOT EXISTS idx_analyses_email_created
+        ON analyses(email, created_at DESC)
+    """)
+    conn.execute("ANALYZE")
     conn.commit()
+
+@st.cache_resource(show_spinner=False)
+def _db():
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=128)
+    conn.row_factory = sqlite3.Row  # name + index access without dict rebuilds
+    # WAL keeps readers off the writers' path and turns each commit into an
+    # appended WAL page instead of a full journal fsync.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    _init_schema(conn)
     return conn
 
 def _now() -> int:
     return int(time.time())
 
+# Cached so idle reruns (keystrokes, page switches) skip the DB; every write
+# path below clears it so credit/plan changes show up immediately.
+@st.cache_data(ttl=30, show_spinner=False)
 def get_user(email: str) -> Dict[str, Any]:
     conn = _db()
-    cur = conn.execute("SELECT email, credits, paid FROM users WHERE email=?", (email,))
-    row = cur.fetchone()
     now = _now()
-    if not row:
-        conn.execute(
-            "INSERT INTO users(email, credits, paid, created_at, updated_at) VALUES(?,?,?,?,?)",
-            (email, FREE_CREDITS, 0, now, now),
-        )
-        conn.commit()
-        return {"email": email, "credits": FREE_CREDITS, "paid": 0}
+    with _db_lock(), conn:
+        row = conn.execute(_SQL_UPSERT_USER, (email, FREE_CREDITS, 0, now, now)).fetchone()
     return {"email": row[0], "credits": int(row[1]), "paid": int(row[2])}
 
 def set_paid(email: str, paid: int = 1):
     conn = _db()
     credits = PRO_CREDITS if paid else FREE_CREDITS
-    conn.execute("UPDATE users SET paid=?, credits=?, updated_at=? WHERE email=?", (paid, credits, _now(), email))
-    conn.commit()
+    now = _now()
+    with _db_lock(), conn:
+        conn.execute(_SQL_SET_PAID, (paid, credits, now, email))
+    get_user.clear()
+
+# orjson is optional: a native encoder that is several times faster on the
+# nested analysis payload; stdlib json keeps the same TEXT column contract.
+try:
+    import orjson
+
+    def json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
 
-def spend_credit(email: str, amount: int = CREDIT_COST_PER_ANALYSIS) -> bool:
+    def json_loads(data) -> Any:
+        return orjson.loads(data)
+except ImportError:
+    import json
+
+    def json_dumps(obj: Any) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+    def json_loads(data) -> Any:
+        return json.loads(data)
+
+def _pack_payload(obj: Any) -> bytes:
+    """JSON-encode and deflate an audit payload for the json_payload column.
+
+    The nested payload compresses several-fold, which keeps analyses rows
+    dense as history grows; SQLite's dynamic typing stores the bytes in the
+    existing column alongside legacy TEXT rows.
+    """
+    return zlib.compress(json_dumps(obj).encode("utf-8"))
+
+def _unpack_payload(blob: Any) -> Any:
+    if isinstance(blob, bytes):
+        return json_loads(zlib.decompress(blob))
+    return json_loads(blob)  # legacy uncompressed TEXT rows
+
+def record_analysis(email: str, address: str, listing_url: str, result: Dict[str, Any], payload: Dict[str, Any], amount: int = CREDIT_COST_PER_ANALYSIS, paid: bool = False) -> bool:
+    """Spend credits (free tier only) and persist the analysis in one transaction.
+
+    Callers that already know the user is paid pass paid=True to skip the
+    credit UPDATE entirely — Pro analyses then cost one INSERT, not two
+    row writes.
+    """
     conn = _db()
-    cur = conn.execute("SELECT credits, paid FROM users WHERE email=?", (email,))
-    row = cur.fetchone()
-    if not row:
-        return False
-    credits, paid = int(row[0]), int(row[1])
-    if paid:
-        return True
-    if credits < amount:
-        return False
-    conn.execute("UPDATE users SET credits = credits - ?, updated_at=? WHERE email=?", (amount, _now(), email))
-    conn.commit()
+    now = _now()
+    with _db_lock(), conn:
+        if not paid:
+            # Single guarded UPDATE: free users pay if they can afford it,
+            # paid users pass through untouched, unknown emails match nothing.
+            cur = conn.execute(_SQL_SPEND_CREDIT, (amount, now, email, amount))
+            if cur.rowcount == 0:
+                return False
+        conn.execute(
+            _SQL_INSERT_ANALYSIS,
+            (
+                email,
+                now,
+                address,
+                listing_url,
+                result.get("grade"),
+                result.get("verdict"),
+                float(result.get("score", 0)),
+                float(result.get("dscr", 0)),
+                float(result.get("noi", 0)),
+                float(result.get("cap_rate", 0)),
+                float(result.get("coc_return", 0)),
+                _pack_payload(payload),
+            ),
+        )
+    if not paid:
+        get_user.clear()  # credit balance changed; refresh cached user rows
     return True
 
-def json_dumps(obj: Any) -> str:
-    import json
-    return json.dumps(obj, ensure_ascii=False)
+def save_analyses_bulk(rows: List[Tuple]) -> None:
+    """Insert many pre-built analysis rows (_SQL_INSERT_ANALYSIS order) in one transaction.
 
-def save_analysis(email: str, address: str, listing_url: str, result: Dict[str, Any], payload: Dict[str, Any]):
+    For batch producers (CSV import, backfills); the interactive click path
+    stays on record_analysis, which also handles credit accounting.
+    """
     conn = _db()
-    conn.execute(
-        """INSERT INTO analyses(email, created_at, address, listing_url, grade, verdict, score, dscr, noi, cap_rate, coc_return, json_payload)
-           VALUES(?,?,?,?,?,?,?,?,?,?,?,?)""",
-        (
-            email,
-            _now(),
-            address,
-            listing_url,
-            result.get("grade"),
-            result.get("verdict"),
-            float(result.get("score", 0)),
-            float(result.get("dscr", 0)),
-            float(result.get("noi", 0)),
-            float(result.get("cap_rate", 0)),
-            float(result.get("coc_return", 0)),
-            json_dumps(payload),
-        ),
-    )
-    conn.commit()
+    with _db_lock(), conn:
+        conn.executemany(_SQL_INSERT_ANALYSIS, rows)
 
-def fetch_analyses(email: str, limit: int = 50) -> List[Dict[str, Any]]:
+def fetch_analyses(email: str, limit: int = 50) -> List[sqlite3.Row]:
     conn = _db()
-    cur = conn.execute(
-        "SELECT created_at, address, listing_url, grade, verdict, score, dscr, noi, cap_rate, coc_return FROM analyses WHERE email=? ORDER BY created_at DESC LIMIT ?",
-        (email, limit),
-    )
-    rows = cur.fetchall()
-    out = []
-    for r in rows:
-        out.append({
-            "created_at": int(r[0]), "address": r[1], "listing_url": r[2],
-            "grade": r[3], "verdict": r[4], "score": r[5],
-            "dscr": r[6], "noi": r[7], "cap_rate": r[8], "coc_return": r[9],
-        })
-    return out
+    return conn.execute(_SQL_FETCH_ANALYSES, (email, limit)).fetchall()
 
 # ----------------------------
 # Formatting helpers
@@ -252,19 +331,28 @@ def ts_to_str(ts: int) -> str:
 # ----------------------------
 # URL → Address (NO scraping)
 # ----------------------------
+_HAS_DIGIT_RE = re.compile(r"\d")
+_TRAILING_RB_RE = re.compile(r"_rb/?$")
+_TRAILING_ID_RE = re.compile(r"\d{6,}$")
+
+# st.cache_data rather than lru_cache: the cache must outlive the per-rerun
+# module for the repeat parses (one per rerun of the Analyze page) to hit.
+@st.cache_data(max_entries=256, show_spinner=False)
 def extract_address_from_url(url: str) -> Optional[str]:
     try:
         parsed = urlparse(url)
         path = parsed.path.strip("/")
         if not path:
             return None
-        segments = [s for s in path.split("/") if any(ch.isdigit() for ch in s)]
-        if not segments:
+        candidate = ""
+        for s in path.split("/"):
+            if len(s) > len(candidate) and _HAS_DIGIT_RE.search(s):
+                candidate = s
+        if not candidate:
             return None
-        candidate = max(segments, key=len)
-        candidate = re.sub(r"_rb/?$", "", candidate)
+        candidate = _TRAILING_RB_RE.sub("", candidate)
         addr = candidate.replace("-", " ")
-        addr = re.sub(r"\d{6,}$", "", addr).strip()
+        addr = _TRAILING_ID_RE.sub("", addr).strip()
         return addr if len(addr) >= 8 else None
     except Exception:
         return None
@@ -272,19 +360,37 @@ def extract_address_from_url(url: str) -> Optional[str]:
 # ----------------------------
 # Real Data Connectors (LEGAL)
 # ----------------------------
-@st.cache_data(ttl=3600, show_spinner=False)
+# Shared session so repeat API calls reuse pooled keep-alive connections
+# instead of paying a fresh TCP+TLS handshake per request. Built lazily so
+# reruns that never touch the connectors skip importing requests entirely.
+@st.cache_resource(show_spinner=False)
+def _http_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return session
+
+# Streamlit re-executes this script per interaction, so a module-level
+# executor would be rebuilt (threads and all) on every rerun; cache_resource
+# keeps one worker pair alive for the server process, like _http_session.
+@st.cache_resource(show_spinner=False)
+def _prefill_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="prefill")
+
+@st.cache_data(ttl=3600, show_spinner=False, persist="disk")
 def fetch_estated(address: str) -> Optional[Dict[str, Any]]:
     token = st.secrets.get("ESTATED_TOKEN", None)
     if not token:
         return None
     url = "https://apis.estated.com/v4/property"
     params = {"token": token, "combined_address": address}
-    r = requests.get(url, params=params, timeout=20)
-    if r.status_code != 200:
-        return None
+    r = _http_session().get(url, params=params, timeout=20)
+    r.raise_for_status()
     return r.json()
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@st.cache_data(ttl=3600, show_spinner=False, persist="disk")
 def fetch_attom(address: str) -> Optional[Dict[str, Any]]:
     apikey = st.secrets.get("ATTOM_APIKEY", None)
     if not apikey:
@@ -292,16 +398,45 @@ def fetch_attom(address: str) -> Optional[Dict[str, Any]]:
     url = "https://api.gateway.attomdata.com/propertyapi/v1.0.0/property/basicprofile"
     headers = {"accept": "application/json", "apikey": apikey}
     params = {"address": address}
-    r = requests.get(url, headers=headers, params=params, timeout=20)
-    if r.status_code != 200:
-        return None
+    r = _http_session().get(url, headers=headers, params=params, timeout=20)
+    r.raise_for_status()
     return r.json()
 
+class _PrefillError(Exception):
+    """A vendor fetch failed; carries the partial merge so callers can still
+    show it. Raised (not returned) so st.cache_data never memoizes failures —
+    the same hour-long-cached-timeout bug fetch_estated/fetch_attom had."""
+
+    def __init__(self, suggested: Dict[str, Any], notes: List[str]):
+        super().__init__("prefill fetch failed")
+        self.suggested = suggested
+        self.notes = notes
+
+@st.cache_data(ttl=3600, show_spinner=False)
 def smart_prefill(address: str) -> Tuple[Dict[str, Any], List[str]]:
+    """Merge vendor lookups for a normalized address; successful merges are
+    memoized across sessions, failed ones raise _PrefillError instead."""
     suggested = {"price": None, "replacement_cost": None, "days_on_market": None}
     notes = []
+    failed = False
 
-    est = fetch_estated(address)
+    # The two lookups are independent HTTP calls; overlap them so prefill
+    # waits for the slower of the two rather than their sum.
+    pool = _prefill_pool()
+    f_est = pool.submit(fetch_estated, address)
+    f_att = pool.submit(fetch_attom, address)
+    try:
+        est = f_est.result()
+    except Exception:
+        est = None
+        failed = True
+        notes.append("Estated request failed; skipped.")
+    try:
+        att = f_att.result()
+    except Exception:
+        att = None
+        failed = True
+        notes.append("ATTOM request failed; skipped.")
     if isinstance(est, dict):
         valuation = est.get("valuation", {}) or {}
         price = valuation.get("market_value") or valuation.get("value")
@@ -311,7 +446,6 @@ def smart_prefill(address: str) -> Tuple[Dict[str, Any], List[str]]:
         else:
             notes.append("Estated available, but no valuation field found.")
 
-    att = fetch_attom(address)
     if isinstance(att, dict):
         try:
             prop = None
@@ -329,104 +463,62 @@ def smart_prefill(address: str) -> Tuple[Dict[str, Any], List[str]]:
 
     if not notes:
         notes.append("No API keys set — manual mode.")
+    if failed:
+        raise _PrefillError(suggested, notes)
     return suggested, notes
 
 # ----------------------------
 # Finance + Underwriting
 # ----------------------------
-def monthly_payment(principal: float, annual_rate_pct: float, term_years: int) -> float:
-    r = (annual_rate_pct / 100) / 12.0
-    n = term_years * 12
-    if r <= 0:
-        return principal / max(n, 1)
-    return principal * (r * (1 + r) ** n) / ((1 + r) ** n - 1)
-
-def get_weights(rate_env: str):
-    if rate_env.upper() == "HIGH":
-        return {"cashflow": 0.32, "downside": 0.25, "location": 0.12, "yield": 0.10, "liquidity": 0.10, "optionality": 0.06, "ai_risk": 0.05}
-    return {"cashflow": 0.28, "downside": 0.20, "location": 0.12, "yield": 0.15, "liquidity": 0.10, "optionality": 0.10, "ai_risk": 0.05}
-
-def kill_switch(dscr_stress: float, rent_reg_risk: bool, dom: int) -> bool:
-    return (dscr_stress < 1.0) or rent_reg_risk or (dom > 180)
-
-def compute_core_numbers(p: PropertyData) -> Dict[str, float]:
-    loan_amount = p.price * (1 - p.down_payment_pct / 100)
-    pay = monthly_payment(loan_amount, p.interest_rate_pct, p.term_years)
-
-    eff_rent = p.monthly_rent * (1 - p.vacancy_rate)
-    noi_month = eff_rent - p.monthly_expenses
-    noi_year = noi_month * 12
-
-    cap_rate = noi_year / max(p.price, 1.0)
-
-    cash_flow_month = noi_month - pay
-    cash_flow_year = cash_flow_month * 12
-    cash_invested = p.price * (p.down_payment_pct / 100)
-    coc = cash_flow_year / max(cash_invested, 1.0)
-
-    stressed_rent = p.monthly_rent * 0.80 * (1 - p.vacancy_rate)
-    stressed_noi_m = stressed_rent - p.monthly_expenses
-    dscr = stressed_noi_m / max(pay, 1.0)
-
-    return {"loan_payment": pay, "noi_year": noi_year, "cap_rate": cap_rate, "coc_return": coc, "dscr_stress": dscr, "cash_flow_month": cash_flow_month}
-
-def calculate_metrics(p: PropertyData, nums: Dict[str, float]) -> Dict[str, float]:
-    cashflow = max(0.0, min(nums["dscr_stress"] / 1.50, 1.0))
-    downside = max(0.0, min((p.replacement_cost / max(p.price, 1.0)) / 1.20, 1.0))
-    location = max(0.0, min(p.job_diversity_index, 1.0))
-    yield_quality = max(0.0, min(nums["cap_rate"] / 0.10, 1.0))
-    liquidity = max(0.0, 1 - (p.days_on_market / 180))
-    return {"cashflow": cashflow, "downside": downside, "location": location, "yield": yield_quality, "liquidity": liquidity, "optionality": 0.60, "ai_risk": 1.0}
-
-def ai_flags(p: PropertyData, nums: Dict[str, float]) -> List[str]:
-    flags = []
-    gross_yield = (p.monthly_rent * 12) / max(p.price, 1.0)
-    if gross_yield > 0.14:
-        flags.append("Rent-to-price looks aggressive (verify comps).")
-    if p.vacancy_rate < 0.05:
-        flags.append("Vacancy assumption looks optimistic.")
-    if p.monthly_expenses < (p.monthly_rent * 0.20):
-        flags.append("Expenses might be understated.")
-    if nums["cap_rate"] < 0.045:
-        flags.append("Low cap rate; deal relies on appreciation/execution.")
-    if p.rent_regulation_risk:
-        flags.append("Regulatory pressure risk.")
-    return flags
+def flag_messages(flags: List[str]) -> List[str]:
+    return [FLAG_TEXT[c] for c in flags]
+
+# Flag codes decouple penalty math and storage from the display copy.
+FLAG_TEXT = {
+    "AGGR_YIELD": "Rent-to-price looks aggressive (verify comps).",
+    "LOW_VACANCY": "Vacancy assumption looks optimistic.",
+    "UNDER_EXPENSES": "Expenses might be understated.",
+    "LOW_CAP": "Low cap rate; deal relies on appreciation/execution.",
+    "REG_RISK": "Regulatory pressure risk.",
+}
+
+_FLAG_PENALTIES = {
+    "AGGR_YIELD": 0.06,
+    "LOW_VACANCY": 0.08,
+    "UNDER_EXPENSES": 0.06,
+    "LOW_CAP": 0.06,
+    "REG_RISK": 0.20,
+}
 
 def ai_penalty(flags: List[str]) -> float:
-    base = 0.0
-    for f in flags:
-        if "aggressive" in f:
-            base += 0.06
-        elif "Vacancy" in f:
-            base += 0.08
-        elif "Expenses" in f:
-            base += 0.06
-        elif "Low cap" in f:
-            base += 0.06
-        elif "Regulatory" in f:
-            base += 0.20
-    return min(base, 0.35)
-
-def score(metrics: Dict[str, float], weights: Dict[str, float]) -> float:
-    return sum(metrics[k] * weights[k] for k in metrics) * 100
+    return min(sum(_FLAG_PENALTIES.get(f, 0.0) for f in flags), 0.35)
+
+def underwrite(p: PropertyData, weights: Tuple[float, ...]):
+    """One fused pass over the underwriting math.
+
+    Returns (nums, metrics, flags, base_score, killed); with Numba installed
+    the whole chain runs as a single compiled kernel.
+    """
+    core, metrics, base_score, bits, killed = underwrite_core(
+        p.price, p.down_payment_pct, p.interest_rate_pct, p.term_years,
+        p.monthly_rent, p.monthly_expenses, p.vacancy_rate,
+        p.replacement_cost, p.days_on_market, p.job_diversity_index,
+        p.rent_regulation_risk, weights,
+    )
+    return dict(zip(CORE_KEYS, core)), metrics, decode_flags(bits), base_score, bool(killed)
+
+# Grade bands, lowest to highest; bisect over the cutoffs picks the band.
+_GRADE_CUTOFFS = (60, 70, 80, 90)
+_GRADE_BANDS = (("F", "PASS"), ("D", "SPECULATIVE"), ("C", "WATCH"), ("B", "BUY"), ("A", "STRONG BUY"))
 
 def grade(score_val: float, killed: bool):
     if killed:
         return "F", "PASS"
-    if score_val >= 90:
-        return "A", "STRONG BUY"
-    if score_val >= 80:
-        return "B", "BUY"
-    if score_val >= 70:
-        return "C", "WATCH"
-    if score_val >= 60:
-        return "D", "SPECULATIVE"
-    return "F", "PASS"
+    return _GRADE_BANDS[bisect.bisect_right(_GRADE_CUTOFFS, score_val)]
 
 def narrative_summary(p: PropertyData, nums: Dict[str, float], flags: List[str]):
     strengths = []
-    risks = flags[:] if flags else []
+    risks = flag_messages(flags)
     if nums["dscr_stress"] >= 1.25:
         strengths.append("Strong stress-tested coverage (DSCR ≥ 1.25).")
     if nums["cap_rate"] >= 0.07:
@@ -441,27 +533,47 @@ def narrative_summary(p: PropertyData, nums: Dict[str, float], flags: List[str])
         risks.append("No major risk flags detected; validate rent comps and true expenses.")
     return strengths[:3], risks[:4]
 
-def build_pdf(path: str, p: PropertyData, nums: Dict[str, float], result: Dict[str, Any], strengths: List[str], risks: List[str], data_notes: List[str]):
-    styles = getSampleStyleSheet()
-    doc = SimpleDocTemplate(path, pagesize=LETTER)
+# cache_resource, not lru_cache: the module (and any lru cache on it) is
+# reborn on every script rerun, while the resource cache outlives reruns.
+@st.cache_resource(show_spinner=False)
+def _pdf_styles():
+    from reportlab.lib.styles import getSampleStyleSheet
+    return getSampleStyleSheet()
+
+def build_pdf(p: PropertyData, nums: Dict[str, float], result: Dict[str, Any], strengths: List[str], risks: List[str], data_notes: List[str]) -> bytes:
+    # Imported here so Streamlit's per-rerun script execution doesn't pay
+    # for reportlab unless a report is actually generated.
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+    from reportlab.lib.pagesizes import LETTER
+    from reportlab.lib import colors
+
+    styles = _pdf_styles()
+    normal = styles["Normal"]
+    heading = styles["Heading2"]
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=LETTER)
     story = []
     story.append(Paragraph(f"{APP_NAME} — Investment Report", styles["Title"]))
     story.append(Spacer(1, 8))
-    story.append(Paragraph(f"<b>Address:</b> {p.address}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Grade:</b> {result['grade']} &nbsp;&nbsp; <b>Score:</b> {result['score']:.1f} &nbsp;&nbsp; <b>Verdict:</b> {result['verdict']}", styles["Normal"]))
-    story.append(Paragraph(f"<b>Stress DSCR:</b> {nums['dscr_stress']:.2f} (rent -20%) &nbsp;&nbsp; <b>Cap Rate:</b> {nums['cap_rate']*100:.2f}% &nbsp;&nbsp; <b>CoC:</b> {nums['coc_return']*100:.2f}%", styles["Normal"]))
+    story.append(Paragraph(f"<b>Address:</b> {p.address}", normal))
+    story.append(Paragraph(f"<b>Grade:</b> {result['grade']} &nbsp;&nbsp; <b>Score:</b> {result['score']:.1f} &nbsp;&nbsp; <b>Verdict:</b> {result['verdict']}", normal))
+    story.append(Paragraph(f"<b>Stress DSCR:</b> {nums['dscr_stress']:.2f} (rent -20%) &nbsp;&nbsp; <b>Cap Rate:</b> {nums['cap_rate']*100:.2f}% &nbsp;&nbsp; <b>CoC:</b> {nums['coc_return']*100:.2f}%", normal))
     story.append(Spacer(1, 10))
+    money = "${:,.0f}".format
+    price_s, rent_s, expenses_s, payment_s, noi_s = map(
+        money, (p.price, p.monthly_rent, p.monthly_expenses, nums["loan_payment"], nums["noi_year"])
+    )
     data = [
         ["Metric", "Value"],
-        ["Price", f"${p.price:,.0f}"],
+        ["Price", price_s],
         ["Down Payment", f"{p.down_payment_pct:.1f}%"],
         ["Interest Rate", f"{p.interest_rate_pct:.2f}%"],
         ["Term", f"{p.term_years} years"],
-        ["Monthly Rent", f"${p.monthly_rent:,.0f}"],
-        ["Monthly Expenses", f"${p.monthly_expenses:,.0f}"],
+        ["Monthly Rent", rent_s],
+        ["Monthly Expenses", expenses_s],
         ["Vacancy Rate", f"{p.vacancy_rate*100:.1f}%"],
-        ["Loan Payment (est.)", f"${nums['loan_payment']:,.0f}"],
-        ["NOI (annual)", f"${nums['noi_year']:,.0f}"],
+        ["Loan Payment (est.)", payment_s],
+        ["NOI (annual)", noi_s],
         ["Days on Market", str(p.days_on_market)],
     ]
     table = Table(data, hAlign="LEFT")
@@ -473,23 +585,21 @@ def build_pdf(path: str, p: PropertyData, nums: Dict[str, float], result: Dict[s
     ]))
     story.append(table)
     story.append(Spacer(1, 10))
-    story.append(Paragraph("Top Strengths", styles["Heading2"]))
-    for s in strengths:
-        story.append(Paragraph(f"• {s}", styles["Normal"]))
+    story.append(Paragraph("Top Strengths", heading))
+    story.extend(Paragraph(f"• {s}", normal) for s in strengths)
     story.append(Spacer(1, 6))
-    story.append(Paragraph("Top Risks / Flags", styles["Heading2"]))
-    for r in risks:
-        story.append(Paragraph(f"• {r}", styles["Normal"]))
+    story.append(Paragraph("Top Risks / Flags", heading))
+    story.extend(Paragraph(f"• {r}", normal) for r in risks)
     story.append(Spacer(1, 6))
-    story.append(Paragraph("Data Notes", styles["Heading2"]))
-    for n in data_notes:
-        story.append(Paragraph(f"• {n}", styles["Normal"]))
+    story.append(Paragraph("Data Notes", heading))
+    story.extend(Paragraph(f"• {n}", normal) for n in data_notes)
     story.append(Spacer(1, 10))
-    story.append(Paragraph("Disclaimer: This report is for informational purposes and is not financial advice. Verify all inputs and assumptions.", styles["Normal"]))
+    story.append(Paragraph("Disclaimer: This report is for informational purposes and is not financial advice. Verify all inputs and assumptions.", normal))
     doc.build(story)
+    return buf.getvalue()
 
 def render_paywall():
-    st.markdown('<div class="aire-card">', unsafe_allow_html=True)
+    st.markdown(CARD_OPEN, unsafe_allow_html=True)
     st.markdown("### Upgrade to Pro")
     st.write("You’ve used your free credits. Upgrade to keep running unlimited analyses and generating reports.")
     pay_link = st.secrets.get("STRIPE_PAYMENT_LINK_URL", "")
@@ -498,7 +608,7 @@ def render_paywall():
     else:
         st.info("Add STRIPE_PAYMENT_LINK_URL in Streamlit secrets to enable payments.")
     st.caption("Automatic unlock via Stripe webhooks is the next upgrade.")
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown(CARD_CLOSE, unsafe_allow_html=True)
 
 def demo_admin_unlock(email: str):
     unlock_code = st.secrets.get("ADMIN_UNLOCK_CODE", "")
@@ -515,15 +625,24 @@ def demo_admin_unlock(email: str):
 # ----------------------------
 # Header + sidebar
 # ----------------------------
-st.markdown(
-    f"""
+@st.cache_data(show_spinner=False)
+def _hero_html() -> str:
+    return f"""
     <div class="aire-hero">
       <div class="aire-title">{APP_NAME}</div>
       <div class="aire-sub">{APP_TAGLINE}</div>
     </div>
-    """,
-    unsafe_allow_html=True,
-)
+    """
+
+@st.cache_data(show_spinner=False)
+def _integration_flags() -> Tuple[bool, bool, bool]:
+    return (
+        bool(st.secrets.get("ESTATED_TOKEN", "")),
+        bool(st.secrets.get("ATTOM_APIKEY", "")),
+        bool(st.secrets.get("STRIPE_PAYMENT_LINK_URL", "")),
+    )
+
+st.markdown(_hero_html(), unsafe_allow_html=True)
 st.write("")
 
 with st.sidebar:
@@ -532,9 +651,10 @@ with st.sidebar:
     page = st.radio("Navigate", ["Analyze", "History", "Account", "About"], index=0)
     st.divider()
     st.caption("Status")
-    st.write(f"Estated: {'✅' if bool(st.secrets.get('ESTATED_TOKEN','')) else '❌'}")
-    st.write(f"ATTOM: {'✅' if bool(st.secrets.get('ATTOM_APIKEY','')) else '❌'}")
-    st.write(f"Stripe: {'✅' if bool(st.secrets.get('STRIPE_PAYMENT_LINK_URL','')) else '❌'}")
+    has_estated, has_attom, has_stripe = _integration_flags()
+    st.write(f"Estated: {'✅' if has_estated else '❌'}")
+    st.write(f"ATTOM: {'✅' if has_attom else '❌'}")
+    st.write(f"Stripe: {'✅' if has_stripe else '❌'}")
 
 # ----------------------------
 # Account identity (simple email)
@@ -566,7 +686,7 @@ if page == "Analyze":
         demo_admin_unlock(st.session_state["email"])
         st.stop()
 
-    st.markdown('<div class="aire-card">', unsafe_allow_html=True)
+    st.markdown(CARD_OPEN, unsafe_allow_html=True)
     st.markdown("### Analyze a property")
     st.caption("Paste a listing link (optional), confirm address, and run underwriting. Your results are saved in History.")
 
@@ -586,8 +706,21 @@ if page == "Analyze":
         data_notes = []
         prefill = st.session_state.get("prefill", {})
         if do_autofill and address.strip():
-            with st.spinner("Fetching property data..."):
-                prefill, data_notes = smart_prefill(address.strip())
+            # One real API round-trip per unique address per session; repeat
+            # auto-fills for the same address come straight from session state.
+            cache = st.session_state.setdefault("prefill_cache", {})
+            addr_key = " ".join(address.lower().split())
+            if addr_key in cache:
+                prefill, data_notes = cache[addr_key]
+            else:
+                with st.spinner("Fetching property data..."):
+                    try:
+                        prefill, data_notes = smart_prefill(addr_key)
+                        cache[addr_key] = (prefill, data_notes)
+                    except _PrefillError as exc:
+                        # Show the partial merge but don't cache it anywhere;
+                        # the next Auto-fill retries the failed vendor.
+                        prefill, data_notes = exc.suggested, exc.notes
             st.session_state["prefill"] = prefill
             st.session_state["data_notes"] = data_notes
         else:
@@ -609,48 +742,47 @@ if page == "Analyze":
         st.write("• PDF report")
         st.write("• Saved history")
 
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown(CARD_CLOSE, unsafe_allow_html=True)
     st.write("")
 
-    st.markdown('<div class="aire-card">', unsafe_allow_html=True)
+    st.markdown(CARD_OPEN, unsafe_allow_html=True)
     st.markdown("### Inputs")
 
     def v(key, default):
         val = prefill.get(key)
         return default if val is None else val
 
-    c1, c2, c3, c4 = st.columns(4)
-    price = c1.number_input("Price ($)", min_value=0.0, value=float(v("price", 400000.0)), step=1000.0)
-    down_payment_pct = c2.number_input("Down payment (%)", min_value=0.0, max_value=100.0, value=20.0, step=1.0)
-    interest_rate_pct = c3.number_input("Interest rate (%)", min_value=0.0, max_value=30.0, value=7.25, step=0.05)
-    term_years = c4.number_input("Term (years)", min_value=1, max_value=40, value=30, step=1)
-
-    d1, d2, d3, d4 = st.columns(4)
-    monthly_rent = d1.number_input("Monthly rent ($)", min_value=0.0, value=3000.0, step=50.0)
-    monthly_expenses = d2.number_input("Monthly expenses ($)", min_value=0.0, value=1100.0, step=50.0)
-    vacancy_rate = d3.slider("Vacancy rate", min_value=0.0, max_value=0.25, value=0.08, step=0.01)
-    days_on_market = d4.number_input("Days on market", min_value=0, value=int(v("days_on_market", 45)), step=1)
-
-    e1, e2, e3, e4 = st.columns(4)
-    replacement_cost = e1.number_input("Replacement cost ($)", min_value=0.0, value=float(v("replacement_cost", 450000.0)), step=1000.0)
-    job_div = e2.slider("Job diversity (0–1)", min_value=0.0, max_value=1.0, value=0.74, step=0.01)
-    reg_risk = e3.checkbox("Rent regulation risk", value=False)
-    stress_rent_cut = e4.slider("Extra rent stress", min_value=0.0, max_value=0.30, value=0.00, step=0.01,
-                                help="Optional: extra rent cut beyond baseline -20% for your own stress testing.")
-
-    st.markdown("</div>", unsafe_allow_html=True)
+    # The form batches edits client-side: changing a field no longer reruns
+    # the whole script; the page only reruns on submit.
+    with st.form("underwriting_inputs"):
+        c1, c2, c3, c4 = st.columns(4)
+        price = c1.number_input("Price ($)", min_value=0.0, value=float(v("price", 400000.0)), step=1000.0)
+        down_payment_pct = c2.number_input("Down payment (%)", min_value=0.0, max_value=100.0, value=20.0, step=1.0)
+        interest_rate_pct = c3.number_input("Interest rate (%)", min_value=0.0, max_value=30.0, value=7.25, step=0.05)
+        term_years = c4.number_input("Term (years)", min_value=1, max_value=40, value=30, step=1)
+
+        d1, d2, d3, d4 = st.columns(4)
+        monthly_rent = d1.number_input("Monthly rent ($)", min_value=0.0, value=3000.0, step=50.0)
+        monthly_expenses = d2.number_input("Monthly expenses ($)", min_value=0.0, value=1100.0, step=50.0)
+        vacancy_rate = d3.slider("Vacancy rate", min_value=0.0, max_value=0.25, value=0.08, step=0.01)
+        days_on_market = d4.number_input("Days on market", min_value=0, value=int(v("days_on_market", 45)), step=1)
+
+        e1, e2, e3, e4 = st.columns(4)
+        replacement_cost = e1.number_input("Replacement cost ($)", min_value=0.0, value=float(v("replacement_cost", 450000.0)), step=1000.0)
+        job_div = e2.slider("Job diversity (0–1)", min_value=0.0, max_value=1.0, value=0.74, step=0.01)
+        reg_risk = e3.checkbox("Rent regulation risk", value=False)
+        stress_rent_cut = e4.slider("Extra rent stress", min_value=0.0, max_value=0.30, value=0.00, step=0.01,
+                                    help="Optional: extra rent cut beyond baseline -20% for your own stress testing.")
+
+        submitted = st.form_submit_button("✅ Run underwriting", type="primary")
+
+    st.markdown(CARD_CLOSE, unsafe_allow_html=True)
     st.write("")
 
-    st.markdown('<div class="aire-card">', unsafe_allow_html=True)
+    st.markdown(CARD_OPEN, unsafe_allow_html=True)
     st.markdown("### Results")
 
-    if st.button("✅ Run underwriting", type="primary"):
-        if not spend_credit(st.session_state["email"], CREDIT_COST_PER_ANALYSIS):
-            st.error("No credits remaining.")
-            st.markdown("</div>", unsafe_allow_html=True)
-            render_paywall()
-            st.stop()
-
+    if submitted:
         p = PropertyData(
             address=address.strip() or "Unknown address",
             price=price,
@@ -666,111 +798,170 @@ if page == "Analyze":
             rent_regulation_risk=reg_risk,
         )
 
-        nums = compute_core_numbers(p)
-        dscr_display = nums["dscr_stress"] * (1 - stress_rent_cut)
-
-        weights = get_weights(rate_env)
-        metrics = calculate_metrics(p, nums)
-        flags = ai_flags(p, nums)
-        penalty = ai_penalty(flags)
-
-        killed = kill_switch(nums["dscr_stress"], p.rent_regulation_risk, p.days_on_market)
-        base_score = score(metrics, weights)
-        final_score = max(base_score * (1 - penalty), 0)
-        g, verdict = grade(final_score, killed)
-
-        strengths, risks = narrative_summary(p, nums, flags)
-
-        k1, k2, k3, k4, k5 = st.columns(5)
-        k1.metric("Grade", g)
-        k2.metric("Score", f"{final_score:.1f}")
-        k3.metric("Verdict", verdict)
-        k4.metric("Stress DSCR", f"{dscr_display:.2f}")
-        k5.metric("Cap Rate", f"{nums['cap_rate']*100:.2f}%")
+        # Keyed on the account too: the same inputs under a different email
+        # are a new run that must be recorded (and charged) for that account.
+        # Built from primitives — the PropertyData class is re-declared on
+        # every script rerun, and dataclass __eq__ across distinct class
+        # objects is always False, so the instance itself can't be the key.
+        run_key = (st.session_state["email"], tuple(sorted(p.__dict__.items())),
+                   listing_url, rate_env, stress_rent_cut, tuple(data_notes))
+        last_run = st.session_state.get("last_run")
+        # Identical inputs to the last recorded run keep its stored outputs:
+        # no recompute, no second credit spend.
+        if last_run is None or last_run[0] != run_key:
+            weights = get_weights(rate_env)
+            nums, metrics, flags, base_score, killed = underwrite(p, weights)
+
+            penalty = ai_penalty(flags)
+            final_score = max(base_score * (1 - penalty), 0)
+            g, verdict = grade(final_score, killed)
+
+            strengths, risks = narrative_summary(p, nums, flags)
+
+            result = {
+                "grade": g,
+                "verdict": verdict,
+                "score": float(final_score),
+                "dscr": float(nums["dscr_stress"]),
+                "noi": float(nums["noi_year"]),
+                "cap_rate": float(nums["cap_rate"]),
+                "coc_return": float(nums["coc_return"]),
+                "kill_switch": bool(killed),
+                "ai_penalty": float(penalty),
+                "rate_env": rate_env,
+            }
+
+            payload = {
+                # PropertyData is flat, so a shallow copy of __dict__ is
+                # equivalent to asdict() without the recursive deep-copy walk.
+                "property": dict(p.__dict__),
+                "numbers": nums,
+                "metrics": dict(zip(METRIC_KEYS, metrics)),
+                "weights": dict(zip(METRIC_KEYS, weights)),
+                "flags": flags,
+                "data_notes": data_notes,
+                "result": result,
+            }
+
+            # Credit spend and history insert share one transaction, so a free
+            # user is only charged when the analysis is actually recorded.
+            if not record_analysis(st.session_state["email"], p.address, listing_url, result, payload,
+                                   paid=bool(user["paid"])):
+                st.error("No credits remaining.")
+                st.markdown(CARD_CLOSE, unsafe_allow_html=True)
+                render_paywall()
+                st.stop()
+
+            st.session_state.pop("last_pdf", None)
+            # Self-contained snapshot: the render/PDF/audit blocks below read
+            # from here so results survive non-submit reruns.
+            st.session_state["last_run"] = (run_key, {
+                "p": p, "nums": nums, "flags": flags, "penalty": penalty,
+                "final_score": final_score, "grade": g, "verdict": verdict,
+                "strengths": strengths, "risks": risks, "result": result,
+                "payload": payload, "data_notes": list(data_notes),
+                "dscr_display": nums["dscr_stress"] * (1 - stress_rent_cut),
+            })
+
+    # The results card renders from the stored run rather than inside the
+    # submit branch, so non-submit reruns (like the Generate PDF click)
+    # don't blank the analysis.
+    last_run = st.session_state.get("last_run")
+    if last_run is not None:
+        outs = last_run[1]
+        nums, strengths, risks = outs["nums"], outs["strengths"], outs["risks"]
+
+        # One flex row in a single element instead of st.columns(5) + five
+        # st.metric widgets (eleven frontend elements for five numbers).
+        kpis = (
+            ("Grade", outs["grade"]),
+            ("Score", f"{outs['final_score']:.1f}"),
+            ("Verdict", outs["verdict"]),
+            ("Stress DSCR", f"{outs['dscr_display']:.2f}"),
+            ("Cap Rate", f"{nums['cap_rate']*100:.2f}%"),
+        )
+        st.markdown(
+            '<div style="display:flex;gap:12px;">'
+            + "".join(
+                f'<div class="aire-kpi" style="flex:1;">'
+                f'<div class="aire-muted" style="font-size:12px;">{label}</div>'
+                f'<div style="font-size:22px;font-weight:800;">{value}</div>'
+                "</div>"
+                for label, value in kpis
+            )
+            + "</div>",
+            unsafe_allow_html=True,
+        )
 
+        # One markdown element per section instead of one element per bullet;
+        # each st.write is a separate delta sent to the frontend.
         s1, s2 = st.columns(2, gap="large")
         with s1:
-            st.markdown("**Strengths**")
-            for s in strengths:
-                st.write(f"• {s}")
-            st.write("")
-            st.markdown("**Key Numbers**")
-            st.write(f"NOI (annual): **{fmt_money(nums['noi_year'])}**")
-            st.write(f"Loan payment (est.): **{fmt_money(nums['loan_payment'])}/mo**")
-            st.write(f"Cash flow (est.): **{fmt_money(nums['cash_flow_month'])}/mo**")
-            st.write(f"Cash-on-cash: **{nums['coc_return']*100:.2f}%**")
+            st.markdown("**Strengths**\n" + "\n".join(f"- {s}" for s in strengths))
+            st.markdown(
+                "**Key Numbers**\n"
+                f"- NOI (annual): **{fmt_money(nums['noi_year'])}**\n"
+                f"- Loan payment (est.): **{fmt_money(nums['loan_payment'])}/mo**\n"
+                f"- Cash flow (est.): **{fmt_money(nums['cash_flow_month'])}/mo**\n"
+                f"- Cash-on-cash: **{nums['coc_return']*100:.2f}%**"
+            )
         with s2:
-            st.markdown("**Risks / Flags**")
-            for r in risks:
-                st.write(f"• {r}")
-            st.write("")
-            st.markdown("**Data Notes**")
-            for n in data_notes:
-                st.write(f"• {n}")
-
-        result = {
-            "grade": g,
-            "verdict": verdict,
-            "score": float(final_score),
-            "dscr": float(nums["dscr_stress"]),
-            "noi": float(nums["noi_year"]),
-            "cap_rate": float(nums["cap_rate"]),
-            "coc_return": float(nums["coc_return"]),
-            "kill_switch": bool(killed),
-            "ai_penalty": float(penalty),
-            "rate_env": rate_env,
-        }
-
-        payload = {
-            "property": asdict(p),
-            "numbers": nums,
-            "metrics": metrics,
-            "weights": weights,
-            "flags": flags,
-            "data_notes": data_notes,
-            "result": result,
-        }
-
-        save_analysis(st.session_state["email"], p.address, listing_url, result, payload)
-
-        pdf_name = f"AIRE_Report_{int(time.time())}.pdf"
-        build_pdf(pdf_name, p, nums, result, strengths, risks, data_notes)
-        with open(pdf_name, "rb") as f:
-            st.download_button("⬇️ Download PDF report", f, file_name=pdf_name, mime="application/pdf")
-
+            st.markdown("**Risks / Flags**\n" + "\n".join(f"- {r}" for r in risks))
+            st.markdown("**Data Notes**\n" + "\n".join(f"- {n}" for n in outs["data_notes"]))
+
+        # PDF generation is deferred behind its own button so reportlab only
+        # runs when a report is actually requested, not on every analysis.
+        if st.button("📄 Generate PDF report"):
+            st.session_state["last_pdf"] = build_pdf(
+                outs["p"], nums, outs["result"], strengths, risks, outs["data_notes"])
+        if "last_pdf" in st.session_state:
+            st.download_button("⬇️ Download PDF report", st.session_state["last_pdf"],
+                               file_name=f"AIRE_Report_{_now()}.pdf", mime="application/pdf")
+
+        # The payload is only serialized to the frontend when the reader
+        # actually opens it.
         with st.expander("Details (audit trail)", expanded=False):
-            st.json(payload)
+            if st.checkbox("Show raw payload", key="show_audit_json"):
+                st.json(outs["payload"])
 
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown(CARD_CLOSE, unsafe_allow_html=True)
     st.write("")
-    st.markdown(f'<div class="aire-disclaimer">Disclaimer: {APP_NAME} is informational and not financial advice. Always verify inputs and assumptions.</div>', unsafe_allow_html=True)
+    st.markdown(DISCLAIMER_HTML, unsafe_allow_html=True)
 
 elif page == "History":
-    st.markdown('<div class="aire-card">', unsafe_allow_html=True)
+    st.markdown(CARD_OPEN, unsafe_allow_html=True)
     st.markdown("### History")
     st.caption("Your last analyses are saved here.")
 
-    items = fetch_analyses(st.session_state["email"], limit=50)
+    items = fetch_analyses(st.session_state["email"], limit=HISTORY_PAGE_SIZE)
     if not items:
         st.info("No analyses yet. Run one in Analyze.")
-        st.markdown("</div>", unsafe_allow_html=True)
+        st.markdown(CARD_CLOSE, unsafe_allow_html=True)
         st.stop()
 
-    for it in items[:20]:
-        cols = st.columns([2.2, 1.2, 0.8, 1.2, 1.0, 1.0, 1.0])
-        cols[0].write(f"**{it['address'] or 'Unknown'}**\n\n{ts_to_str(it['created_at'])}")
-        cols[1].write(it["verdict"])
-        cols[2].write(f"**{it['grade']}**")
-        cols[3].write(f"{it['score']:.1f}")
-        cols[4].write(f"{it['dscr']:.2f}")
-        cols[5].write(f"{it['cap_rate']*100:.2f}%")
-        cols[6].write(f"{it['coc_return']*100:.2f}%")
-        st.divider()
+    import pandas as pd
 
-    st.markdown("</div>", unsafe_allow_html=True)
+    df = pd.DataFrame(
+        items,
+        columns=["created_at", "address", "listing_url", "grade", "verdict",
+                 "score", "dscr", "noi", "cap_rate", "coc_return"],
+    )
+    view = pd.DataFrame({
+        "Address": df["address"].fillna("Unknown"),
+        "When": df["created_at"].map(ts_to_str),
+        "Verdict": df["verdict"],
+        "Grade": df["grade"],
+        "Score": df["score"].round(1),
+        "Stress DSCR": df["dscr"].round(2),
+        "Cap Rate": (df["cap_rate"] * 100).round(2).astype(str) + "%",
+        "CoC": (df["coc_return"] * 100).round(2).astype(str) + "%",
+    })
+    st.dataframe(view, hide_index=True, width="stretch")
+
+    st.markdown(CARD_CLOSE, unsafe_allow_html=True)
 
 elif page == "Account":
-    st.markdown('<div class="aire-card">', unsafe_allow_html=True)
+    st.markdown(CARD_OPEN, unsafe_allow_html=True)
     st.markdown("### Account")
     st.write(f"Signed in as: **{st.session_state['email']}**")
     if user["paid"]:
@@ -790,10 +981,10 @@ elif page == "Account":
 
     st.write("")
     demo_admin_unlock(st.session_state["email"])
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown(CARD_CLOSE, unsafe_allow_html=True)
 
 else:
-    st.markdown('<div class="aire-card">', unsafe_allow_html=True)
+    st.markdown(CARD_OPEN, unsafe_allow_html=True)
     st.markdown("### About")
     st.write("AIRE™ is a deterministic underwriting system with AI-style risk flagging and clean reporting.")
     st.write("It is designed to be auditable: math drives scores; flags only reduce score (never inflate).")
@@ -803,4 +994,4 @@ else:
     st.write("• Rent comps module (range + confidence)")
     st.write("• Portfolio analytics dashboard")
     st.write("• Team accounts & shared workspaces")
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown(CARD_CLOSE, unsafe_allow_html=True)
@@ -0,0 +1,142 @@
+"""Compiled underwriting math for the AIRE app.
+
+The @njit(cache=True) kernels live here, not in app.py, because Streamlit
+re-executes the main script in a fresh module on every rerun: dispatchers
+defined there are rebuilt per rerun, and numba's on-disk cache loader
+re-imports the defining file by path — which for app.py means re-running
+the whole Streamlit script mid-run and registering every widget twice.
+A real module persists in sys.modules, so the kernels are compiled (or
+loaded from NUMBA_CACHE_DIR) exactly once per process.
+"""
+import os
+from typing import List, Tuple
+
+# Numba is optional: when installed, the scalar underwriting math below is
+# JIT-compiled; otherwise the plain-Python definitions run unchanged. Pin the
+# on-disk kernel cache to a stable location before the import so cache=True
+# functions reload compiled machine code across restarts instead of
+# recompiling.
+os.environ.setdefault("NUMBA_CACHE_DIR",
+                      os.path.join(os.path.expanduser("~"), ".aire_numba_cache"))
+try:
+    from numba import njit as _njit
+except ImportError:
+    def _njit(*args, **kwargs):
+        def _wrap(fn):
+            return fn
+        return _wrap
+
+@_njit(cache=True)
+def monthly_payment(principal: float, annual_rate_pct: float, term_years: int) -> float:
+    r = (annual_rate_pct / 100) / 12.0
+    n = term_years * 12
+    if r <= 0:
+        return principal / max(n, 1)
+    growth = (1 + r) ** n
+    return principal * r * growth / (growth - 1)
+
+# Metric components and weights travel as tuples in this fixed order; the
+# dict form is rebuilt only at the edges (payload/UI) via dict(zip(...)).
+METRIC_KEYS = ("cashflow", "downside", "location", "yield", "liquidity", "optionality", "ai_risk")
+_WEIGHTS_HIGH = (0.32, 0.25, 0.12, 0.10, 0.10, 0.06, 0.05)
+_WEIGHTS_NORMAL = (0.28, 0.20, 0.12, 0.15, 0.10, 0.10, 0.05)
+
+def get_weights(rate_env: str) -> Tuple[float, ...]:
+    return _WEIGHTS_HIGH if rate_env.upper() == "HIGH" else _WEIGHTS_NORMAL
+
+@_njit(cache=True)
+def kill_switch(dscr_stress: float, rent_reg_risk: bool, dom: int) -> bool:
+    return (dscr_stress < 1.0) or rent_reg_risk or (dom > 180)
+
+# Keys for the tuple returned by _core_numbers, in order.
+CORE_KEYS = ("loan_payment", "noi_year", "cap_rate", "coc_return", "dscr_stress", "cash_flow_month")
+
+@_njit(cache=True)
+def _core_numbers(price: float, down_payment_pct: float, interest_rate_pct: float,
+                  term_years: int, monthly_rent: float, monthly_expenses: float,
+                  vacancy_rate: float) -> Tuple[float, ...]:
+    loan_amount = price * (1 - down_payment_pct / 100)
+    pay = monthly_payment(loan_amount, interest_rate_pct, term_years)
+
+    eff_rent = monthly_rent * (1 - vacancy_rate)
+    noi_month = eff_rent - monthly_expenses
+    noi_year = noi_month * 12
+
+    cap_rate = noi_year / max(price, 1.0)
+
+    cash_flow_month = noi_month - pay
+    cash_flow_year = cash_flow_month * 12
+    cash_invested = price * (down_payment_pct / 100)
+    coc = cash_flow_year / max(cash_invested, 1.0)
+
+    stressed_rent = monthly_rent * 0.80 * (1 - vacancy_rate)
+    stressed_noi_m = stressed_rent - monthly_expenses
+    dscr = stressed_noi_m / max(pay, 1.0)
+
+    return (pay, noi_year, cap_rate, coc, dscr, cash_flow_month)
+
+@_njit(cache=True)
+def calculate_metrics(dscr_stress: float, cap_rate: float, price: float,
+                      replacement_cost: float, job_diversity_index: float,
+                      days_on_market: int) -> Tuple[float, ...]:
+    cashflow = max(0.0, min(dscr_stress / 1.50, 1.0))
+    downside = max(0.0, min((replacement_cost / max(price, 1.0)) / 1.20, 1.0))
+    location = max(0.0, min(job_diversity_index, 1.0))
+    yield_quality = max(0.0, min(cap_rate / 0.10, 1.0))
+    liquidity = max(0.0, 1 - (days_on_market / 180))
+    return (cashflow, downside, location, yield_quality, liquidity, 0.60, 1.0)
+
+# Bit positions match FLAG_ORDER; the kernel works in bitmasks so string
+# handling stays outside compiled code.
+FLAG_ORDER = ("AGGR_YIELD", "LOW_VACANCY", "UNDER_EXPENSES", "LOW_CAP", "REG_RISK")
+
+@_njit(cache=True)
+def _flag_bits(price: float, monthly_rent: float, monthly_expenses: float,
+               vacancy_rate: float, cap_rate: float, rent_regulation_risk: bool) -> int:
+    bits = 0
+    gross_yield = (monthly_rent * 12) / max(price, 1.0)
+    if gross_yield > 0.14:
+        bits |= 1
+    if vacancy_rate < 0.05:
+        bits |= 2
+    if monthly_expenses < (monthly_rent * 0.20):
+        bits |= 4
+    if cap_rate < 0.045:
+        bits |= 8
+    if rent_regulation_risk:
+        bits |= 16
+    return bits
+
+def decode_flags(bits: int) -> List[str]:
+    return [code for i, code in enumerate(FLAG_ORDER) if bits & (1 << i)]
+
+@_njit(cache=True)
+def score(metrics: Tuple[float, ...], weights: Tuple[float, ...]) -> float:
+    total = 0.0
+    for m, w in zip(metrics, weights):
+        total += m * w
+    return total * 100
+
+@_njit(cache=True)
+def underwrite_core(price, down_payment_pct, interest_rate_pct, term_years,
+                    monthly_rent, monthly_expenses, vacancy_rate,
+                    replacement_cost, days_on_market, job_diversity_index,
+                    rent_regulation_risk, weights):
+    """Fused kernel: core numbers -> metrics -> score -> flag bits -> kill switch."""
+    core = _core_numbers(price, down_payment_pct, interest_rate_pct, term_years,
+                         monthly_rent, monthly_expenses, vacancy_rate)
+    dscr_stress = core[4]
+    cap_rate = core[2]
+    metrics = calculate_metrics(dscr_stress, cap_rate, price, replacement_cost,
+                                job_diversity_index, days_on_market)
+    base_score = score(metrics, weights)
+    bits = _flag_bits(price, monthly_rent, monthly_expenses, vacancy_rate,
+                      cap_rate, rent_regulation_risk)
+    killed = kill_switch(dscr_stress, rent_regulation_risk, days_on_market)
+    return core, metrics, base_score, bits, killed
+
+# Warm the fused kernel at import with the argument types the app uses, so
+# the first analysis loads compiled code from NUMBA_CACHE_DIR (or compiles
+# once at startup) instead of paying JIT latency on the first click. This
+# module is imported once per process, so the warm-up never runs per rerun.
+underwrite_core(1.0, 20.0, 7.0, 30, 1.0, 1.0, 0.05, 1.0, 10, 0.74, False, _WEIGHTS_NORMAL)